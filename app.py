@@ -1,15 +1,27 @@
-from typing import Dict, Any
+from typing import Any, AsyncIterator, Dict
+import orjson
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from processing import SymptomExtractor, DiagnosisModule, PubMedSearch, Summarizer
+from processing import (
+    NoSymptomsError,
+    build_diagnosis_dict,
+    get_combined_analyzer,
+    get_pubmed_search,
+    get_summarizer,
+    run_pipeline,
+)
+from processing.medical_filter import contains_medical_terms
+from processing.semantic_cache import SemanticCache
 
 
 app = FastAPI(
     title="Medical Diagnosis API",
     description="AI-powered medical symptom analysis and diagnosis assistance",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware for frontend integration
@@ -21,11 +33,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize processing modules
-symptom_extractor = SymptomExtractor()
-diagnosis_module = DiagnosisModule()
-pubmed_search = PubMedSearch()
-summarizer = Summarizer()
+# Shared processing modules (singletons, reused by the MCP entrypoint)
+combined_analyzer = get_combined_analyzer()
+pubmed_search = get_pubmed_search()
+summarizer = get_summarizer()
+
+# Semantic cache so near-duplicate symptom descriptions skip the pipeline
+response_cache = SemanticCache(threshold=0.86)
 
 
 class DiagnoseRequest(BaseModel):
@@ -50,6 +64,12 @@ MEDICAL_DISCLAIMER = (
 )
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the shared PubMed HTTP client."""
+    await pubmed_search.aclose()
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API information."""
@@ -83,66 +103,131 @@ async def diagnose(request: DiagnoseRequest):
     if not request.symptoms or not request.symptoms.strip():
         raise HTTPException(status_code=400, detail="Symptoms description is required")
 
-    try:
-        # Step 1: Extract symptoms from user input
-        extracted = await symptom_extractor.extract(request.symptoms)
+    # Cheap lexical screen so garbage input never reaches the LLM
+    if not contains_medical_terms(request.symptoms):
+        raise HTTPException(
+            status_code=400,
+            detail="No medical terms detected in the provided description"
+        )
 
-        if not extracted.symptoms:
-            raise HTTPException(
-                status_code=400,
-                detail="Could not extract any symptoms from the provided description"
-            )
+    try:
+        # Check the semantic cache before running any LLM/PubMed calls
+        query_embedding = await response_cache.embed(request.symptoms)
+        cached_response = await response_cache.get(query_embedding)
+        if cached_response is not None:
+            return cached_response
 
-        # Step 2: Generate diagnosis
-        diagnosis_result = await diagnosis_module.diagnose(
-            symptoms=extracted.symptoms,
-            duration=extracted.duration,
-            severity=extracted.severity
-        )
+        result = await run_pipeline(request.symptoms)
 
-        # Step 3: Search PubMed for relevant articles
-        condition_names = [c.name for c in diagnosis_result.conditions]
-        search_query = pubmed_search.build_search_query(
-            symptoms=extracted.symptoms,
-            conditions=condition_names
-        )
-        articles = await pubmed_search.search(search_query, max_results=5)
+        response = DiagnoseResponse(**result, disclaimer=MEDICAL_DISCLAIMER)
 
-        # Step 4: Summarize PubMed results
-        summary = await summarizer.summarize(
-            articles=articles,
-            symptoms=extracted.symptoms,
-            conditions=condition_names
-        )
+        await response_cache.put(query_embedding, response)
 
-        return DiagnoseResponse(
-            symptoms=extracted.symptoms,
-            duration=extracted.duration,
-            severity=extracted.severity,
-            diagnosis={
-                "conditions": [
-                    {
-                        "name": c.name,
-                        "probability": c.probability,
-                        "description": c.description
-                    }
-                    for c in diagnosis_result.conditions
-                ],
-                "recommendations": diagnosis_result.recommendations,
-                "urgency": diagnosis_result.urgency
-            },
-            pubmed_summary=summary.to_dict(),
-            disclaimer=MEDICAL_DISCLAIMER
-        )
+        return response
 
+    except NoSymptomsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
 
+def _ndjson(event: Dict[str, Any]) -> bytes:
+    """Encode one NDJSON event line."""
+    return orjson.dumps(event) + b"\n"
+
+
+@app.post("/diagnose/stream")
+async def diagnose_stream(request: DiagnoseRequest):
+    """
+    Streaming variant of /diagnose emitting NDJSON events.
+
+    Events arrive as each pipeline stage completes:
+    - "analysis": extracted symptoms and diagnosis
+    - "summary": incremental summary text chunks
+    - "references": article references once the summary finishes
+    - "error": processing failure
+    """
+    if not request.symptoms or not request.symptoms.strip():
+        raise HTTPException(status_code=400, detail="Symptoms description is required")
+
+    # Cheap lexical screen so garbage input never reaches the LLM
+    if not contains_medical_terms(request.symptoms):
+        raise HTTPException(
+            status_code=400,
+            detail="No medical terms detected in the provided description"
+        )
+
+    async def event_stream() -> AsyncIterator[bytes]:
+        try:
+            # Steps 1+2: Extract symptoms and generate diagnosis in one LLM call
+            analysis = await combined_analyzer.analyze(request.symptoms)
+
+            if not analysis.symptoms:
+                yield _ndjson({
+                    "event": "error",
+                    "detail": "Could not extract any symptoms from the provided description"
+                })
+                return
+
+            condition_names = [c.name for c in analysis.conditions]
+
+            yield _ndjson({
+                "event": "analysis",
+                "symptoms": analysis.symptoms,
+                "duration": analysis.duration,
+                "severity": analysis.severity,
+                "diagnosis": build_diagnosis_dict(analysis),
+                "disclaimer": MEDICAL_DISCLAIMER
+            })
+
+            # Step 3: Search PubMed for relevant articles
+            search_query = pubmed_search.build_search_query(
+                symptoms=analysis.symptoms,
+                conditions=condition_names
+            )
+            articles = await pubmed_search.search(search_query, max_results=5)
+
+            # Step 4: Stream the summary as the LLM generates it
+            async for chunk in summarizer.summarize_stream(
+                articles=articles,
+                symptoms=analysis.symptoms,
+                conditions=condition_names
+            ):
+                yield _ndjson({"event": "summary", "text": chunk})
+
+            yield _ndjson({
+                "event": "references",
+                "articles_found": len(articles),
+                "references": [
+                    {
+                        "title": article.title,
+                        "pmid": article.pmid,
+                        "year": article.year,
+                        "url": f"https://pubmed.ncbi.nlm.nih.gov/{article.pmid}/"
+                    }
+                    for article in articles
+                ]
+            })
+
+        except Exception as e:
+            yield _ndjson({"event": "error", "detail": f"Processing error: {str(e)}"})
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
+    import os
+
     import uvicorn
     import config
 
-    uvicorn.run(app, host=config.API_HOST, port=config.API_PORT)
+    uvicorn.run(
+        "app:app",
+        host=config.API_HOST,
+        port=config.API_PORT,
+        workers=max(2, os.cpu_count() or 1),
+        loop="uvloop",
+        http="httptools"
+    )
@@ -1,20 +1,15 @@
-import json
+import orjson
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
-from processing import SymptomExtractor, DiagnosisModule, PubMedSearch, Summarizer
+from processing import NoSymptomsError, run_pipeline
+from processing.medical_filter import contains_medical_terms
 
 
 # Initialize MCP server
 server = Server("medical-diagnosis")
 
-# Initialize processing modules
-symptom_extractor = SymptomExtractor()
-diagnosis_module = DiagnosisModule()
-pubmed_search = PubMedSearch()
-summarizer = Summarizer()
-
 
 MEDICAL_DISCLAIMER = (
     "IMPORTANT: This information is for educational purposes only and is NOT medical advice. "
@@ -63,66 +58,39 @@ async def call_tool(name: str, arguments: dict):
             text="Error: Please provide a description of your symptoms."
         )]
 
-    try:
-        # Step 1: Extract symptoms from user input
-        extracted = await symptom_extractor.extract(symptoms_input)
-
-        if not extracted.symptoms:
-            return [TextContent(
-                type="text",
-                text="Could not extract any symptoms from the provided description. Please provide more details about your symptoms."
-            )]
-
-        # Step 2: Generate diagnosis
-        diagnosis_result = await diagnosis_module.diagnose(
-            symptoms=extracted.symptoms,
-            duration=extracted.duration,
-            severity=extracted.severity
-        )
-
-        # Step 3: Search PubMed for relevant articles
-        condition_names = [c.name for c in diagnosis_result.conditions]
-        search_query = pubmed_search.build_search_query(
-            symptoms=extracted.symptoms,
-            conditions=condition_names
-        )
-        articles = await pubmed_search.search(search_query, max_results=5)
+    # Cheap lexical screen so garbage input never reaches the LLM
+    if not contains_medical_terms(symptoms_input):
+        return [TextContent(
+            type="text",
+            text="No medical terms detected in the provided description. Please describe your symptoms."
+        )]
 
-        # Step 4: Summarize PubMed results
-        summary = await summarizer.summarize(
-            articles=articles,
-            symptoms=extracted.symptoms,
-            conditions=condition_names
-        )
+    try:
+        # Run the shared pipeline (fused extraction+diagnosis, PubMed, summary)
+        pipeline_result = await run_pipeline(symptoms_input)
 
         # Format response
         result = {
             "disclaimer": MEDICAL_DISCLAIMER,
             "extracted_symptoms": {
-                "symptoms": extracted.symptoms,
-                "duration": extracted.duration or "Not specified",
-                "severity": extracted.severity or "Not specified"
-            },
-            "diagnosis": {
-                "conditions": [
-                    {
-                        "name": c.name,
-                        "probability": c.probability,
-                        "description": c.description
-                    }
-                    for c in diagnosis_result.conditions
-                ],
-                "recommendations": diagnosis_result.recommendations,
-                "urgency": diagnosis_result.urgency
+                "symptoms": pipeline_result["symptoms"],
+                "duration": pipeline_result["duration"] or "Not specified",
+                "severity": pipeline_result["severity"] or "Not specified"
             },
-            "pubmed_research": summary.to_dict()
+            "diagnosis": pipeline_result["diagnosis"],
+            "pubmed_research": pipeline_result["pubmed_summary"]
         }
 
         return [TextContent(
             type="text",
-            text=json.dumps(result, indent=2)
+            text=orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
         )]
 
+    except NoSymptomsError:
+        return [TextContent(
+            type="text",
+            text="Could not extract any symptoms from the provided description. Please provide more details about your symptoms."
+        )]
     except Exception as e:
         return [TextContent(
             type="text",
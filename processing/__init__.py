@@ -1,6 +1,105 @@
+import functools
+
 from .symptom_extractor import SymptomExtractor
 from .diagnosis_module import DiagnosisModule
+from .combined_analyzer import CombinedAnalyzer
 from .pubmed_search import PubMedSearch
 from .summarizer import Summarizer
 
-__all__ = ["SymptomExtractor", "DiagnosisModule", "PubMedSearch", "Summarizer"]
+__all__ = [
+    "SymptomExtractor",
+    "DiagnosisModule",
+    "CombinedAnalyzer",
+    "PubMedSearch",
+    "Summarizer",
+    "NoSymptomsError",
+    "build_diagnosis_dict",
+    "run_pipeline",
+    "get_symptom_extractor",
+    "get_diagnosis_module",
+    "get_combined_analyzer",
+    "get_pubmed_search",
+    "get_summarizer",
+]
+
+
+class NoSymptomsError(ValueError):
+    """Raised when no symptoms can be extracted from the input."""
+
+
+async def run_pipeline(symptoms: str) -> dict:
+    """Run the full analyze -> PubMed -> summarize pipeline.
+
+    Shared by the FastAPI and MCP entrypoints so both use the same
+    singletons, caches and response payload shape.
+    """
+    analysis = await get_combined_analyzer().analyze(symptoms)
+
+    if not analysis.symptoms:
+        raise NoSymptomsError(
+            "Could not extract any symptoms from the provided description"
+        )
+
+    pubmed = get_pubmed_search()
+    condition_names = [c.name for c in analysis.conditions]
+    search_query = pubmed.build_search_query(
+        symptoms=analysis.symptoms,
+        conditions=condition_names
+    )
+    articles = await pubmed.search(search_query, max_results=5)
+
+    summary = await get_summarizer().summarize(
+        articles=articles,
+        symptoms=analysis.symptoms,
+        conditions=condition_names
+    )
+
+    return {
+        "symptoms": analysis.symptoms,
+        "duration": analysis.duration,
+        "severity": analysis.severity,
+        "diagnosis": build_diagnosis_dict(analysis),
+        "pubmed_summary": summary.to_dict()
+    }
+
+
+def build_diagnosis_dict(result) -> dict:
+    """Build the diagnosis payload shared by the API and MCP entrypoints.
+
+    Works for any result carrying conditions, recommendations and urgency
+    (DiagnosisResult or ExtractedAndDiagnosed).
+    """
+    return {
+        "conditions": [c.model_dump() for c in result.conditions],
+        "recommendations": result.recommendations,
+        "urgency": result.urgency
+    }
+
+
+# Lazy singletons so every entrypoint shares one instance (and its caches
+# and HTTP connection pools) instead of building its own at import
+
+
+@functools.cache
+def get_symptom_extractor() -> SymptomExtractor:
+    return SymptomExtractor()
+
+
+@functools.cache
+def get_diagnosis_module() -> DiagnosisModule:
+    return DiagnosisModule()
+
+
+@functools.cache
+def get_combined_analyzer() -> CombinedAnalyzer:
+    return CombinedAnalyzer()
+
+
+@functools.cache
+def get_pubmed_search() -> PubMedSearch:
+    return PubMedSearch()
+
+
+@functools.cache
+def get_summarizer() -> Summarizer:
+    return Summarizer()
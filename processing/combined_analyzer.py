@@ -0,0 +1,81 @@
+import asyncio
+from typing import List
+from cachetools import LRUCache
+from pydantic import BaseModel, Field
+
+from .diagnosis_module import Condition
+from .openai_client import StructuredCompletion
+from .symptom_extractor import _normalize
+
+
+class ExtractedAndDiagnosed(BaseModel):
+    """Schema for fused symptom extraction and diagnosis results."""
+    symptoms: List[str] = Field(description="List of extracted medical symptoms")
+    duration: str = Field(default="", description="Duration of symptoms if mentioned")
+    severity: str = Field(default="", description="Severity level if mentioned")
+    conditions: List[Condition] = Field(description="List of potential conditions")
+    recommendations: List[str] = Field(description="General health recommendations")
+    urgency: str = Field(description="Urgency level: emergency, urgent, routine, or self-care")
+
+
+_PROMPT = """You are a medical analysis assistant. First extract all medical symptoms from the user's description, then generate a list of potential conditions based on those symptoms.
+
+IMPORTANT DISCLAIMER: This is for informational purposes only and NOT medical advice. Users should always consult healthcare professionals.
+
+User Description: {user_input}
+
+Important:
+- Extract individual symptoms as separate items
+- Normalize symptom names (e.g., "headache" not "my head hurts")
+- Include duration and severity if mentioned
+- Only extract actual symptoms, not diagnoses or conditions
+
+Guidelines:
+- List 2-5 most likely conditions based on the extracted symptoms
+- Rank by probability (high, medium, low)
+- Include brief, patient-friendly descriptions
+- Provide general health recommendations
+- Assess urgency level appropriately
+- Be conservative - when in doubt, recommend professional consultation
+"""
+
+
+class CombinedAnalyzer:
+    """Extract symptoms and generate diagnoses in a single LLM call.
+
+    Fusing the two steps halves the LLM round-trips and avoids re-sending
+    the extracted symptoms back to the model in a second prompt.
+    """
+
+    def __init__(self):
+        self.chain = StructuredCompletion(ExtractedAndDiagnosed, temperature=0)
+
+        self._cache: LRUCache = LRUCache(maxsize=10000)
+        self._cache_lock = asyncio.Lock()
+
+    async def analyze(self, user_input: str) -> ExtractedAndDiagnosed:
+        """Extract symptoms and diagnose in one call, caching on normalized text."""
+        cache_key = _normalize(user_input)
+
+        async with self._cache_lock:
+            cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        result = await self.chain.ainvoke(_PROMPT.format(user_input=user_input))
+
+        async with self._cache_lock:
+            self._cache[cache_key] = result
+        return result
+
+    def analyze_sync(self, user_input: str) -> ExtractedAndDiagnosed:
+        """Synchronous version of analyze."""
+        cache_key = _normalize(user_input)
+
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        result = self.chain.invoke(_PROMPT.format(user_input=user_input))
+        self._cache[cache_key] = result
+        return result
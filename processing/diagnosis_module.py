@@ -1,10 +1,9 @@
+import asyncio
 from typing import List
+from cachetools import LRUCache
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 
-import config
+from .openai_client import StructuredCompletion
 
 
 class Condition(BaseModel):
@@ -21,19 +20,7 @@ class DiagnosisResult(BaseModel):
     urgency: str = Field(description="Urgency level: emergency, urgent, routine, or self-care")
 
 
-class DiagnosisModule:
-    """Generate potential diagnoses based on extracted symptoms."""
-
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model=config.OPENAI_MODEL,
-            api_key=config.OPENAI_API_KEY,
-            temperature=0.1
-        )
-        self.output_parser = PydanticOutputParser(pydantic_object=DiagnosisResult)
-
-        self.prompt = PromptTemplate(
-            template="""You are a medical diagnosis assistant. Based on the provided symptoms, generate a list of potential conditions.
+_PROMPT = """You are a medical diagnosis assistant. Based on the provided symptoms, generate a list of potential conditions.
 
 IMPORTANT DISCLAIMER: This is for informational purposes only and NOT medical advice. Users should always consult healthcare professionals.
 
@@ -41,8 +28,6 @@ Symptoms: {symptoms}
 Duration: {duration}
 Severity: {severity}
 
-{format_instructions}
-
 Guidelines:
 - List 2-5 most likely conditions based on symptoms
 - Rank by probability (high, medium, low)
@@ -50,27 +35,51 @@ Guidelines:
 - Provide general health recommendations
 - Assess urgency level appropriately
 - Be conservative - when in doubt, recommend professional consultation
-""",
-            input_variables=["symptoms", "duration", "severity"],
-            partial_variables={"format_instructions": self.output_parser.get_format_instructions()}
-        )
+"""
+
+
+class DiagnosisModule:
+    """Generate potential diagnoses based on extracted symptoms."""
+
+    def __init__(self):
+        self.chain = StructuredCompletion(DiagnosisResult, temperature=0.1)
 
-        self.chain = self.prompt | self.llm | self.output_parser
+        self._cache: LRUCache = LRUCache(maxsize=10000)
+        self._cache_lock = asyncio.Lock()
+
+    def _build_prompt(self, symptoms: List[str], duration: str, severity: str) -> str:
+        return _PROMPT.format(
+            symptoms=", ".join(symptoms),
+            duration=duration or "Not specified",
+            severity=severity or "Not specified"
+        )
 
     async def diagnose(self, symptoms: List[str], duration: str = "", severity: str = "") -> DiagnosisResult:
-        """Generate diagnosis based on symptoms."""
-        result = await self.chain.ainvoke({
-            "symptoms": ", ".join(symptoms),
-            "duration": duration or "Not specified",
-            "severity": severity or "Not specified"
-        })
+        """Generate diagnosis based on symptoms, caching on the inputs."""
+        # Symptom order doesn't change the answer, so sort for the key
+        cache_key = (tuple(sorted(symptoms)), duration, severity)
+
+        async with self._cache_lock:
+            cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        result = await self.chain.ainvoke(
+            self._build_prompt(symptoms, duration, severity)
+        )
+
+        async with self._cache_lock:
+            self._cache[cache_key] = result
         return result
 
     def diagnose_sync(self, symptoms: List[str], duration: str = "", severity: str = "") -> DiagnosisResult:
         """Synchronous version of diagnose."""
-        result = self.chain.invoke({
-            "symptoms": ", ".join(symptoms),
-            "duration": duration or "Not specified",
-            "severity": severity or "Not specified"
-        })
+        cache_key = (tuple(sorted(symptoms)), duration, severity)
+
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        result = self.chain.invoke(self._build_prompt(symptoms, duration, severity))
+        self._cache[cache_key] = result
         return result
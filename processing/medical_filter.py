@@ -0,0 +1,45 @@
+import re
+
+
+# Common symptom and body-part tokens used to pre-screen input before any
+# LLM call. The list only needs enough coverage to reject obvious
+# non-medical text; the extractor still does the real work on hits.
+SYMPTOM_LEXICON = (
+    "ache", "aching", "acid", "allergy", "allergic", "anxiety", "appetite",
+    "arm", "asthma", "back", "belly", "bleed", "bleeding", "blister",
+    "bloat", "bloated", "blood", "blurry", "blurred", "body", "bone",
+    "bowel", "breath", "breathing", "breathless", "bruise", "bruising",
+    "burn", "burning", "chest", "chill", "chills", "cold", "confusion",
+    "congestion", "congested", "constipation", "constipated", "cough",
+    "coughing", "cramp", "cramps", "cramping", "diarrhea", "diarrhoea",
+    "dizzy", "dizziness", "drowsy", "drowsiness", "dry", "ear", "earache",
+    "eye", "eyes", "faint", "fainting", "fatigue", "fatigued", "fever",
+    "feverish", "flu", "foot", "feet", "gas", "hand", "head", "headache",
+    "headaches", "heart", "heartburn", "hip", "hive", "hives", "hurt",
+    "hurts", "hurting", "ill", "indigestion", "infection", "inflamed",
+    "inflammation", "insomnia", "irritation", "irritated", "itch", "itchy",
+    "itching", "jaw", "joint", "joints", "knee", "leg", "legs",
+    "lightheaded", "limb", "lump", "migraine", "migraines", "mouth",
+    "mucus", "muscle", "muscles", "nausea", "nauseous", "neck", "nose",
+    "nosebleed", "numb", "numbness", "pain", "painful", "pains",
+    "palpitation", "palpitations", "phlegm", "pressure", "rash", "rashes",
+    "runny", "shoulder", "sick", "sinus", "skin", "sneeze", "sneezing",
+    "sore", "soreness", "spasm", "spasms", "stiff", "stiffness", "stomach",
+    "stool", "stuffy", "sweat", "sweating", "sweats", "swelling",
+    "swollen", "symptom", "symptoms", "throat", "throbbing", "tight",
+    "tightness", "tingling", "tired", "tiredness", "toe", "tooth",
+    "toothache", "tremor", "urination", "urine", "vertigo", "vision",
+    "vomit", "vomiting", "weak", "weakness", "wheeze", "wheezing", "wound",
+    "wrist",
+)
+
+# One compiled alternation so screening is a single scan rather than a
+# per-term loop
+_LEXICON_PATTERN = re.compile(
+    r"\b(?:" + "|".join(sorted(SYMPTOM_LEXICON, key=len, reverse=True)) + r")\b"
+)
+
+
+def contains_medical_terms(text: str) -> bool:
+    """Check whether the text mentions at least one known medical term."""
+    return _LEXICON_PATTERN.search(text.lower()) is not None
@@ -0,0 +1,82 @@
+import functools
+from typing import Any, Type
+
+from openai import AsyncOpenAI, OpenAI
+from pydantic import BaseModel
+
+import config
+
+
+@functools.cache
+def get_async_client() -> AsyncOpenAI:
+    """Shared async client so all modules reuse one connection pool."""
+    return AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+
+
+@functools.cache
+def get_sync_client() -> OpenAI:
+    """Shared sync client for the *_sync code paths."""
+    return OpenAI(api_key=config.OPENAI_API_KEY)
+
+
+def _strict_schema(schema: Any) -> Any:
+    """Rewrite a model_json_schema() dict to be strict-mode compliant.
+
+    Strict structured outputs require every property listed in required
+    and additionalProperties: false on every object, and reject the
+    default keyword - none of which Pydantic emits for fields with
+    defaults. Mutates nested dicts in place and returns the schema.
+    """
+    if isinstance(schema, dict):
+        if schema.get("type") == "object" and "properties" in schema:
+            schema["additionalProperties"] = False
+            schema["required"] = list(schema["properties"])
+        schema.pop("default", None)
+        for value in schema.values():
+            _strict_schema(value)
+    elif isinstance(schema, list):
+        for item in schema:
+            _strict_schema(item)
+    return schema
+
+
+class StructuredCompletion:
+    """Issue chat completions that return schema-validated Pydantic models.
+
+    Uses the OpenAI structured-outputs response format so the model emits
+    parse-guaranteed JSON, replacing the PromptTemplate | ChatOpenAI |
+    PydanticOutputParser stack and the format-instructions tokens it added
+    to every prompt.
+    """
+
+    def __init__(self, model_cls: Type[BaseModel], temperature: float = 0.0):
+        self.model_cls = model_cls
+        self.temperature = temperature
+        self._response_format = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": model_cls.__name__,
+                "schema": _strict_schema(model_cls.model_json_schema()),
+                "strict": True
+            }
+        }
+
+    async def ainvoke(self, prompt: str) -> Any:
+        """Run one completion and parse the response into the model."""
+        response = await get_async_client().chat.completions.create(
+            model=config.OPENAI_MODEL,
+            temperature=self.temperature,
+            messages=[{"role": "user", "content": prompt}],
+            response_format=self._response_format
+        )
+        return self.model_cls.model_validate_json(response.choices[0].message.content)
+
+    def invoke(self, prompt: str) -> Any:
+        """Synchronous version of ainvoke."""
+        response = get_sync_client().chat.completions.create(
+            model=config.OPENAI_MODEL,
+            temperature=self.temperature,
+            messages=[{"role": "user", "content": prompt}],
+            response_format=self._response_format
+        )
+        return self.model_cls.model_validate_json(response.choices[0].message.content)
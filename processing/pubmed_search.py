@@ -1,27 +1,49 @@
-from typing import List, Dict, Any
+import asyncio
+import io
+from dataclasses import asdict, dataclass
+from typing import List, Dict, Any, Optional
 import httpx
-import xml.etree.ElementTree as ET
+from cachetools import TTLCache
+from lxml import etree
 
 import config
 
 
+# PubMed content changes slowly, so cached results stay valid for an hour
+CACHE_MAX_ENTRIES = 1024
+CACHE_TTL_SECONDS = 3600
+
+MAX_AUTHORS = 3
+
+# XPath objects compiled once instead of re-parsed per article
+_XP_PMID = etree.XPath("string(.//PMID)")
+_XP_TITLE = etree.XPath("string(.//ArticleTitle)")
+_XP_ABSTRACT = etree.XPath("string(.//Abstract/AbstractText)")
+_XP_YEAR = etree.XPath("string(.//PubDate/Year)")
+_XP_MEDLINE_DATE = etree.XPath("string(.//PubDate/MedlineDate)")
+_XP_AUTHORS = etree.XPath(".//Author")
+_XP_LAST_NAME = etree.XPath("string(LastName)")
+_XP_INITIALS = etree.XPath("string(Initials)")
+
+
+# Shared client for the synchronous path, reused across calls for keep-alive
+_sync_client = httpx.Client(
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+    timeout=30.0
+)
+
+
+@dataclass(slots=True)
 class PubMedArticle:
     """Represents a PubMed article."""
-    def __init__(self, pmid: str, title: str, abstract: str, year: str, authors: List[str]):
-        self.pmid = pmid
-        self.title = title
-        self.abstract = abstract
-        self.year = year
-        self.authors = authors
+    pmid: str
+    title: str
+    abstract: str
+    year: str
+    authors: List[str]
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "pmid": self.pmid,
-            "title": self.title,
-            "abstract": self.abstract,
-            "year": self.year,
-            "authors": self.authors
-        }
+        return asdict(self)
 
 
 class PubMedSearch:
@@ -30,6 +52,13 @@ class PubMedSearch:
     def __init__(self):
         self.base_url = config.PUBMED_BASE_URL
         self.api_key = config.PUBMED_API_KEY
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_lock = asyncio.Lock()
+        self._result_cache: TTLCache = TTLCache(
+            maxsize=CACHE_MAX_ENTRIES,
+            ttl=CACHE_TTL_SECONDS
+        )
+        self._query_locks: Dict[str, asyncio.Lock] = {}
 
     def _build_params(self, params: Dict[str, str]) -> Dict[str, str]:
         """Add API key to params if available."""
@@ -37,134 +66,191 @@ class PubMedSearch:
             params["api_key"] = self.api_key
         return params
 
-    async def search(self, query: str, max_results: int = 5) -> List[PubMedArticle]:
-        """Search PubMed for articles matching the query."""
-        async with httpx.AsyncClient() as client:
-            # Step 1: Search for article IDs
-            search_params = self._build_params({
+    def _fetch_params(
+        self,
+        esearch_result: Dict[str, Any],
+        id_list: List[str],
+        max_results: int
+    ) -> Dict[str, str]:
+        """Build efetch params, preferring the history server over an id list."""
+        webenv = esearch_result.get("webenv")
+        query_key = esearch_result.get("querykey")
+
+        if webenv and query_key:
+            params = {
                 "db": "pubmed",
-                "term": query,
+                "WebEnv": webenv,
+                "query_key": query_key,
                 "retmax": str(max_results),
-                "retmode": "json",
-                "sort": "relevance"
-            })
-
-            search_response = await client.get(
-                f"{self.base_url}esearch.fcgi",
-                params=search_params,
-                timeout=30.0
-            )
-            search_data = search_response.json()
-
-            id_list = search_data.get("esearchresult", {}).get("idlist", [])
-
-            if not id_list:
-                return []
-
-            # Step 2: Fetch article details
-            fetch_params = self._build_params({
+                "retmode": "xml",
+                "rettype": "abstract"
+            }
+        else:
+            params = {
                 "db": "pubmed",
                 "id": ",".join(id_list),
                 "retmode": "xml",
                 "rettype": "abstract"
-            })
+            }
+
+        return self._build_params(params)
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Lazily create the shared client so connections are reused."""
+        if self._client is None:
+            async with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_keepalive_connections=20,
+                            max_connections=50
+                        ),
+                        timeout=30.0
+                    )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the shared client (call on application shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
-            fetch_response = await client.get(
-                f"{self.base_url}efetch.fcgi",
-                params=fetch_params,
-                timeout=30.0
-            )
+    async def search(self, query: str, max_results: int = 5) -> List[PubMedArticle]:
+        """Search PubMed for articles matching the query, with TTL caching."""
+        cache_key = f"{query}|{max_results}"
+
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-            return self._parse_articles(fetch_response.text)
+        # Coalesce concurrent identical queries behind one per-key lock
+        lock = self._query_locks.setdefault(cache_key, asyncio.Lock())
+        try:
+            async with lock:
+                cached = self._result_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+                articles = await self._search_uncached(query, max_results)
+                self._result_cache[cache_key] = articles
+                return articles
+        finally:
+            self._query_locks.pop(cache_key, None)
+
+    async def _search_uncached(self, query: str, max_results: int) -> List[PubMedArticle]:
+        """Run the esearch/efetch round-trips without consulting the cache."""
+        client = await self._get_client()
+
+        # Step 1: Search for article IDs
+        search_params = self._build_params({
+            "db": "pubmed",
+            "term": query,
+            "retmax": str(max_results),
+            "retmode": "json",
+            "sort": "relevance",
+            "usehistory": "y"
+        })
+
+        search_response = await client.get(
+            f"{self.base_url}esearch.fcgi",
+            params=search_params
+        )
+        search_data = search_response.json()
+
+        result = search_data.get("esearchresult", {})
+        id_list = result.get("idlist", [])
+
+        if not id_list:
+            return []
+
+        # Step 2: Fetch article details via the history server, falling back
+        # to an explicit id list if WebEnv is unavailable
+        fetch_params = self._fetch_params(result, id_list, max_results)
+
+        fetch_response = await client.get(
+            f"{self.base_url}efetch.fcgi",
+            params=fetch_params
+        )
+
+        # Parse in a worker thread so the CPU-bound XML walk (lxml releases
+        # the GIL) doesn't stall the event loop
+        return await asyncio.to_thread(self._parse_articles, fetch_response.content)
 
     def search_sync(self, query: str, max_results: int = 5) -> List[PubMedArticle]:
         """Synchronous version of search."""
-        with httpx.Client() as client:
-            # Step 1: Search for article IDs
-            search_params = self._build_params({
-                "db": "pubmed",
-                "term": query,
-                "retmax": str(max_results),
-                "retmode": "json",
-                "sort": "relevance"
-            })
-
-            search_response = client.get(
-                f"{self.base_url}esearch.fcgi",
-                params=search_params,
-                timeout=30.0
-            )
-            search_data = search_response.json()
-
-            id_list = search_data.get("esearchresult", {}).get("idlist", [])
-
-            if not id_list:
-                return []
-
-            # Step 2: Fetch article details
-            fetch_params = self._build_params({
-                "db": "pubmed",
-                "id": ",".join(id_list),
-                "retmode": "xml",
-                "rettype": "abstract"
-            })
-
-            fetch_response = client.get(
-                f"{self.base_url}efetch.fcgi",
-                params=fetch_params,
-                timeout=30.0
-            )
-
-            return self._parse_articles(fetch_response.text)
+        cache_key = f"{query}|{max_results}"
+
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Step 1: Search for article IDs
+        search_params = self._build_params({
+            "db": "pubmed",
+            "term": query,
+            "retmax": str(max_results),
+            "retmode": "json",
+            "sort": "relevance",
+            "usehistory": "y"
+        })
+
+        search_response = _sync_client.get(
+            f"{self.base_url}esearch.fcgi",
+            params=search_params
+        )
+        search_data = search_response.json()
+
+        result = search_data.get("esearchresult", {})
+        id_list = result.get("idlist", [])
+
+        if not id_list:
+            return []
+
+        # Step 2: Fetch article details via the history server, falling back
+        # to an explicit id list if WebEnv is unavailable
+        fetch_params = self._fetch_params(result, id_list, max_results)
+
+        fetch_response = _sync_client.get(
+            f"{self.base_url}efetch.fcgi",
+            params=fetch_params
+        )
+
+        articles = self._parse_articles(fetch_response.content)
+        self._result_cache[cache_key] = articles
+        return articles
 
-    def _parse_articles(self, xml_text: str) -> List[PubMedArticle]:
+    def _parse_articles(self, xml_bytes: bytes) -> List[PubMedArticle]:
         """Parse PubMed XML response into article objects."""
         articles = []
 
         try:
-            root = ET.fromstring(xml_text)
+            for _, article_elem in etree.iterparse(
+                io.BytesIO(xml_bytes),
+                events=("end",),
+                tag="PubmedArticle"
+            ):
+                pmid = _XP_PMID(article_elem)
+                title = _XP_TITLE(article_elem)
+                abstract = _XP_ABSTRACT(article_elem)
+
+                year = _XP_YEAR(article_elem)
+                if not year:
+                    # Try MedlineDate if Year not available
+                    medline_date = _XP_MEDLINE_DATE(article_elem)
+                    if medline_date:
+                        year = medline_date[:4]
 
-            for article_elem in root.findall(".//PubmedArticle"):
-                pmid = ""
-                title = ""
-                abstract = ""
-                year = ""
+                # Extract authors, stopping once we have enough
                 authors = []
-
-                # Extract PMID
-                pmid_elem = article_elem.find(".//PMID")
-                if pmid_elem is not None:
-                    pmid = pmid_elem.text or ""
-
-                # Extract title
-                title_elem = article_elem.find(".//ArticleTitle")
-                if title_elem is not None:
-                    title = title_elem.text or ""
-
-                # Extract abstract
-                abstract_elem = article_elem.find(".//Abstract/AbstractText")
-                if abstract_elem is not None:
-                    abstract = abstract_elem.text or ""
-
-                # Extract year
-                year_elem = article_elem.find(".//PubDate/Year")
-                if year_elem is not None:
-                    year = year_elem.text or ""
-                else:
-                    # Try MedlineDate if Year not available
-                    medline_date = article_elem.find(".//PubDate/MedlineDate")
-                    if medline_date is not None and medline_date.text:
-                        year = medline_date.text[:4]
-
-                # Extract authors
-                for author_elem in article_elem.findall(".//Author"):
-                    last_name = author_elem.find("LastName")
-                    initials = author_elem.find("Initials")
-                    if last_name is not None and last_name.text:
-                        author_name = last_name.text
-                        if initials is not None and initials.text:
-                            author_name += f" {initials.text}"
-                        authors.append(author_name)
+                for author_elem in _XP_AUTHORS(article_elem):
+                    last_name = _XP_LAST_NAME(author_elem)
+                    if last_name:
+                        initials = _XP_INITIALS(author_elem)
+                        if initials:
+                            last_name += f" {initials}"
+                        authors.append(last_name)
+                        if len(authors) >= MAX_AUTHORS:
+                            break
 
                 if pmid and title:
                     articles.append(PubMedArticle(
@@ -172,10 +258,15 @@ class PubMedSearch:
                         title=title,
                         abstract=abstract,
                         year=year,
-                        authors=authors[:3]  # Limit to first 3 authors
+                        authors=authors
                     ))
 
-        except ET.ParseError:
+                # Free the parsed subtree to keep memory flat
+                article_elem.clear()
+                while article_elem.getprevious() is not None:
+                    del article_elem.getparent()[0]
+
+        except etree.XMLSyntaxError:
             pass
 
         return articles
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Any, List, Optional
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+
+EMBEDDING_MODEL = "paraphrase-albert-small-v2"
+
+
+class _CacheEntry:
+    """A cached value keyed by the centroid of the queries that hit it."""
+    def __init__(self, embedding: np.ndarray, value: Any):
+        self.centroid = embedding
+        self.value = value
+        self.hits = 1
+
+    def absorb(self, embedding: np.ndarray) -> None:
+        """Fold a new query embedding into the centroid."""
+        centroid = (self.centroid * self.hits + embedding) / (self.hits + 1)
+        norm = np.linalg.norm(centroid)
+        if norm > 0:
+            centroid = centroid / norm
+        self.centroid = centroid
+        self.hits += 1
+
+
+class SemanticCache:
+    """Cache responses keyed on sentence embeddings of the query text.
+
+    Near-duplicate queries (cosine similarity >= threshold against a stored
+    centroid) return the cached value without re-running the pipeline.
+    """
+
+    def __init__(self, threshold: float = 0.86, max_entries: int = 256):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: List[_CacheEntry] = []
+        self._lock = asyncio.Lock()
+        self._model: Optional[SentenceTransformer] = None
+
+    def _embed(self, text: str) -> np.ndarray:
+        """Embed and L2-normalize the query text (blocking)."""
+        if self._model is None:
+            self._model = SentenceTransformer(EMBEDDING_MODEL)
+        embedding = self._model.encode(text, convert_to_numpy=True)
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding = embedding / norm
+        return embedding
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed the query text without blocking the event loop."""
+        return await asyncio.to_thread(self._embed, text)
+
+    async def get(self, embedding: np.ndarray) -> Optional[Any]:
+        """Return the cached value for the closest centroid, or None on miss."""
+        async with self._lock:
+            best_entry = None
+            best_score = self.threshold
+
+            for entry in self._entries:
+                score = float(np.dot(entry.centroid, embedding))
+                if score >= best_score:
+                    best_score = score
+                    best_entry = entry
+
+            if best_entry is None:
+                return None
+
+            best_entry.absorb(embedding)
+            return best_entry.value
+
+    async def put(self, embedding: np.ndarray, value: Any) -> None:
+        """Insert a value keyed on the query embedding."""
+        async with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Evict the least-used entry to make room
+                self._entries.remove(min(self._entries, key=lambda e: e.hits))
+            self._entries.append(_CacheEntry(embedding, value))
@@ -1,4 +1,5 @@
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any
+import tiktoken
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 
@@ -6,6 +7,46 @@ import config
 from .pubmed_search import PubMedArticle
 
 
+# LLM latency and cost scale with input tokens, so cap each abstract and
+# the overall prompt contribution
+ABSTRACT_TOKEN_LIMIT = 400
+PROMPT_TOKEN_BUDGET = 3000
+
+try:
+    _ENCODING = tiktoken.encoding_for_model(config.OPENAI_MODEL)
+except KeyError:
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+
+
+def _truncate_tokens(text: str, limit: int) -> str:
+    """Trim text to at most limit tokens."""
+    tokens = _ENCODING.encode(text)
+    if len(tokens) <= limit:
+        return text
+    return _ENCODING.decode(tokens[:limit])
+
+
+def _pack_abstracts(articles: List[PubMedArticle]) -> str:
+    """Pack abstracts most-recent-first within the prompt token budget."""
+    pieces = []
+    total_tokens = 0
+
+    for article in sorted(articles, key=lambda a: a.year, reverse=True):
+        if not article.abstract:
+            continue
+        piece = (
+            f"Title: {article.title}\n"
+            f"Abstract: {_truncate_tokens(article.abstract, ABSTRACT_TOKEN_LIMIT)}"
+        )
+        piece_tokens = len(_ENCODING.encode(piece))
+        if pieces and total_tokens + piece_tokens > PROMPT_TOKEN_BUDGET:
+            break
+        pieces.append(piece)
+        total_tokens += piece_tokens
+
+    return "\n\n".join(pieces)
+
+
 class PubMedSummary:
     """Represents a summarized PubMed search result."""
     def __init__(
@@ -74,12 +115,8 @@ Summary:""",
                 references=[]
             )
 
-        # Prepare abstracts text
-        abstracts_text = "\n\n".join([
-            f"Title: {article.title}\nAbstract: {article.abstract or 'No abstract available'}"
-            for article in articles
-            if article.abstract
-        ])
+        # Pack abstracts into the prompt token budget
+        abstracts_text = _pack_abstracts(articles)
 
         if not abstracts_text:
             abstracts_text = "No abstracts available for the found articles."
@@ -108,6 +145,31 @@ Summary:""",
             references=references
         )
 
+    async def summarize_stream(
+        self,
+        articles: List[PubMedArticle],
+        symptoms: List[str],
+        conditions: List[str]
+    ) -> AsyncIterator[str]:
+        """Stream the summary text chunk by chunk as the LLM generates it."""
+        if not articles:
+            yield "No relevant medical literature found for these symptoms."
+            return
+
+        # Pack abstracts into the prompt token budget
+        abstracts_text = _pack_abstracts(articles)
+
+        if not abstracts_text:
+            abstracts_text = "No abstracts available for the found articles."
+
+        async for chunk in self.chain.astream({
+            "symptoms": ", ".join(symptoms),
+            "conditions": ", ".join(conditions),
+            "abstracts": abstracts_text
+        }):
+            if chunk.content:
+                yield chunk.content
+
     def summarize_sync(
         self,
         articles: List[PubMedArticle],
@@ -122,12 +184,8 @@ Summary:""",
                 references=[]
             )
 
-        # Prepare abstracts text
-        abstracts_text = "\n\n".join([
-            f"Title: {article.title}\nAbstract: {article.abstract or 'No abstract available'}"
-            for article in articles
-            if article.abstract
-        ])
+        # Pack abstracts into the prompt token budget
+        abstracts_text = _pack_abstracts(articles)
 
         if not abstracts_text:
             abstracts_text = "No abstracts available for the found articles."
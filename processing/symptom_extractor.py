@@ -1,10 +1,15 @@
+import asyncio
+import re
 from typing import List
+from cachetools import LRUCache
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 
-import config
+from .openai_client import StructuredCompletion
+
+
+def _normalize(user_input: str) -> str:
+    """Collapse whitespace and case so trivial rephrasings share a cache key."""
+    return re.sub(r"\s+", " ", user_input.strip().lower())
 
 
 class ExtractedSymptoms(BaseModel):
@@ -14,43 +19,51 @@ class ExtractedSymptoms(BaseModel):
     severity: str = Field(default="", description="Severity level if mentioned")
 
 
-class SymptomExtractor:
-    """Extract structured symptoms from user descriptions using GPT-4."""
-
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model=config.OPENAI_MODEL,
-            api_key=config.OPENAI_API_KEY,
-            temperature=0
-        )
-        self.output_parser = PydanticOutputParser(pydantic_object=ExtractedSymptoms)
-
-        self.prompt = PromptTemplate(
-            template="""You are a medical symptom extraction assistant. Extract all medical symptoms from the user's description.
+_PROMPT = """You are a medical symptom extraction assistant. Extract all medical symptoms from the user's description.
 
 User Description: {user_input}
 
-{format_instructions}
-
 Important:
 - Extract individual symptoms as separate items
 - Normalize symptom names (e.g., "headache" not "my head hurts")
 - Include duration if mentioned (e.g., "3 days", "1 week")
 - Include severity if mentioned (e.g., "mild", "severe", "moderate")
 - Only extract actual symptoms, not diagnoses or conditions
-""",
-            input_variables=["user_input"],
-            partial_variables={"format_instructions": self.output_parser.get_format_instructions()}
-        )
+"""
 
-        self.chain = self.prompt | self.llm | self.output_parser
+
+class SymptomExtractor:
+    """Extract structured symptoms from user descriptions using GPT-4."""
+
+    def __init__(self):
+        self.chain = StructuredCompletion(ExtractedSymptoms, temperature=0)
+
+        self._cache: LRUCache = LRUCache(maxsize=10000)
+        self._cache_lock = asyncio.Lock()
 
     async def extract(self, user_input: str) -> ExtractedSymptoms:
-        """Extract symptoms from user input."""
-        result = await self.chain.ainvoke({"user_input": user_input})
+        """Extract symptoms from user input, caching on the normalized text."""
+        cache_key = _normalize(user_input)
+
+        async with self._cache_lock:
+            cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        result = await self.chain.ainvoke(_PROMPT.format(user_input=user_input))
+
+        async with self._cache_lock:
+            self._cache[cache_key] = result
         return result
 
     def extract_sync(self, user_input: str) -> ExtractedSymptoms:
         """Synchronous version of extract."""
-        result = self.chain.invoke({"user_input": user_input})
+        cache_key = _normalize(user_input)
+
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        result = self.chain.invoke(_PROMPT.format(user_input=user_input))
+        self._cache[cache_key] = result
         return result
@@ -1,14 +1,23 @@
+import asyncio
+import atexit
+import functools
+import threading
+import time
 import streamlit as st
 import httpx
-import xml.etree.ElementTree as ET
+import io
+import numpy as np
+from lxml import etree
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from pydantic import BaseModel, Field
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 from dotenv import load_dotenv
 
+import ui_common
+
 load_dotenv()
 
 # Page configuration
@@ -28,69 +37,8 @@ try:
 except (KeyError, FileNotFoundError):
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 
-# Custom CSS
-st.markdown("""
-<style>
-    .disclaimer-box {
-        background-color: #000000;
-        color: #ffffff;
-        border: 1px solid #333333;
-        border-radius: 5px;
-        padding: 15px;
-        margin-bottom: 20px;
-    }
-    .symptom-tag {
-        display: inline-block;
-        background-color: #e3f2fd;
-        color: #1976d2;
-        padding: 5px 12px;
-        margin: 3px;
-        border-radius: 20px;
-        font-size: 14px;
-    }
-    .condition-card {
-        border-radius: 8px;
-        padding: 15px;
-        margin: 10px 0;
-        border-left: 5px solid;
-        color: #ffffff;
-    }
-    .condition-card h4 {
-        margin: 0 0 10px 0;
-        color: #ffffff;
-    }
-    .condition-card p {
-        margin: 5px 0;
-        color: #ffffff;
-    }
-    .condition-high {
-        background-color: #dc3545;
-        border-left-color: #a71d2a;
-    }
-    .condition-medium {
-        background-color: #fd7e14;
-        border-left-color: #c96000;
-    }
-    .condition-low {
-        background-color: #28a745;
-        border-left-color: #1e7e34;
-    }
-    .urgency-emergency {
-        color: #dc3545;
-        font-weight: bold;
-    }
-    .urgency-urgent {
-        color: #fd7e14;
-        font-weight: bold;
-    }
-    .urgency-routine {
-        color: #ffc107;
-    }
-    .urgency-self-care {
-        color: #28a745;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Shared page chrome (CSS lives in static/style.css)
+ui_common.inject_css()
 
 # --- Pydantic Models ---
 class ExtractedSymptoms(BaseModel):
@@ -108,71 +56,73 @@ class DiagnosisResult(BaseModel):
     recommendations: List[str] = Field(description="General health recommendations")
     urgency: str = Field(description="Urgency level: emergency, urgent, routine, or self-care")
 
+class CombinedResult(BaseModel):
+    extracted: ExtractedSymptoms = Field(description="Symptoms extracted from the description")
+    diagnosis: DiagnosisResult = Field(description="Diagnosis based on the extracted symptoms")
+
 # --- Processing Functions ---
 @st.cache_resource
-def get_symptom_extractor():
-    llm = ChatOpenAI(model=OPENAI_MODEL, api_key=OPENAI_API_KEY, temperature=0)
-    output_parser = PydanticOutputParser(pydantic_object=ExtractedSymptoms)
-    prompt = PromptTemplate(
-        template="""You are a medical symptom extraction assistant. Extract all medical symptoms from the user's description.
-
-User Description: {user_input}
-
-{format_instructions}
-
-Important:
-- Extract individual symptoms as separate items
-- Normalize symptom names (e.g., "headache" not "my head hurts")
-- Include duration if mentioned (e.g., "3 days", "1 week")
-- Include severity if mentioned (e.g., "mild", "severe", "moderate")
-- Only extract actual symptoms, not diagnoses or conditions
-""",
-        input_variables=["user_input"],
-        partial_variables={"format_instructions": output_parser.get_format_instructions()}
+def get_llm() -> ChatOpenAI:
+    """One shared ChatOpenAI client for every chain.
+
+    A single instance means one connection pool and one auth setup instead
+    of one per chain; defaults to temperature 0, and chains needing a
+    different temperature bind their own per-call.
+    """
+    return ChatOpenAI(
+        model=OPENAI_MODEL,
+        api_key=OPENAI_API_KEY,
+        temperature=0,
+        max_retries=4,
+        http_client=httpx.Client(limits=httpx.Limits(max_keepalive_connections=20)),
+        http_async_client=httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=20))
     )
-    return prompt | llm | output_parser
-
-def extract_symptoms(user_input: str):
-    """Extract symptoms from user input."""
-    extractor = get_symptom_extractor()
-    return extractor.invoke({"user_input": user_input})
 
 @st.cache_resource
-def get_diagnosis_chain():
-    llm = ChatOpenAI(model=OPENAI_MODEL, api_key=OPENAI_API_KEY, temperature=0.1)
-    output_parser = PydanticOutputParser(pydantic_object=DiagnosisResult)
+def get_combined_chain():
+    """Single chain doing extraction and diagnosis in one LLM call."""
     prompt = PromptTemplate(
-        template="""You are a medical diagnosis assistant. Based on the provided symptoms, generate a list of potential conditions.
+        template="""You are a medical analysis assistant. First extract all medical symptoms from the user's description, then generate a list of potential conditions based on those symptoms.
 
 IMPORTANT DISCLAIMER: This is for informational purposes only and NOT medical advice. Users should always consult healthcare professionals.
 
-Symptoms: {symptoms}
-Duration: {duration}
-Severity: {severity}
+User Description: {user_input}
 
-{format_instructions}
+Important:
+- Extract individual symptoms as separate items
+- Normalize symptom names (e.g., "headache" not "my head hurts")
+- Include duration and severity if mentioned
+- Only extract actual symptoms, not diagnoses or conditions
 
 Guidelines:
-- List 2-5 most likely conditions based on symptoms
+- List 2-5 most likely conditions based on the extracted symptoms
 - Rank by probability (high, medium, low)
 - Include brief, patient-friendly descriptions
 - Provide general health recommendations
 - Assess urgency level appropriately
 - Be conservative - when in doubt, recommend professional consultation
 """,
-        input_variables=["symptoms", "duration", "severity"],
-        partial_variables={"format_instructions": output_parser.get_format_instructions()}
+        input_variables=["user_input"]
     )
-    return prompt | llm | output_parser
+    # Native structured output (tool calling) instead of PydanticOutputParser:
+    # no format_instructions schema dump in the prompt, no re-parse in Python
+    return prompt | get_llm().with_structured_output(CombinedResult)
 
-def get_diagnosis(symptoms: str, duration: str, severity: str):
-    """Generate diagnosis from symptoms."""
-    chain = get_diagnosis_chain()
-    return chain.invoke({"symptoms": symptoms, "duration": duration, "severity": severity})
+async def analyze_symptoms(user_input: str) -> CombinedResult:
+    """Extract symptoms and diagnose in one LLM call."""
+    chain = get_combined_chain()
+    return await chain.ainvoke({"user_input": user_input})
+
+# Bounds on what the summarizer sees and says, so cost and latency stay
+# flat even when PubMed returns unusually long abstracts
+ABSTRACT_CHAR_LIMIT = 1500
+ABSTRACTS_TOTAL_CHAR_LIMIT = 8000
+SUMMARY_MAX_TOKENS = 400
 
 @st.cache_resource
 def get_summarizer_chain():
-    llm = ChatOpenAI(model=OPENAI_MODEL, api_key=OPENAI_API_KEY, temperature=0.2)
+    # max_tokens keeps summary cost and latency bounded
+    llm = get_llm().bind(temperature=0.2, max_tokens=SUMMARY_MAX_TOKENS)
     prompt = PromptTemplate(
         template="""You are a medical information summarizer. Create a patient-friendly summary of the following medical research abstracts.
 
@@ -196,22 +146,119 @@ Summary:""",
     )
     return prompt | llm
 
-def get_summary(symptoms: str, conditions: str, abstracts: str):
-    """Generate summary from abstracts."""
+def stream_summary(symptoms: str, conditions: str, abstracts: str):
+    """Yield summary text chunks as the LLM generates them."""
     chain = get_summarizer_chain()
-    return chain.invoke({"symptoms": symptoms, "conditions": conditions, "abstracts": abstracts})
+    for chunk in chain.stream({"symptoms": symptoms, "conditions": conditions, "abstracts": abstracts}):
+        if chunk.content:
+            yield chunk.content
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Persistent event loop running in a background thread.
+
+    The cached async clients outlive any single script run, so driving
+    them with asyncio.run() per submit would bind their keep-alive
+    connections to loops that are already closed ("Event loop is
+    closed" on the next submit). One long-lived loop keeps client,
+    connection pool and loop lifetimes aligned.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True, name="pipeline-loop").start()
+    return loop
+
+def run_async(coro):
+    """Run a coroutine on the persistent loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+@st.cache_resource
+def get_http_client() -> httpx.AsyncClient:
+    """Shared async HTTP client with a keep-alive connection pool."""
+    client = httpx.AsyncClient(
+        http2=True,
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=30),
+        # Compressed efetch XML is a fraction of its raw 50-200KB size
+        headers={"Accept-Encoding": "gzip, deflate"}
+    )
+    atexit.register(lambda: run_async(client.aclose()))
+    return client
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def search_pubmed(query: str, max_results: int = 5) -> List[Dict]:
+# PubMed content changes slowly, so cached search results stay fresh
+PUBMED_CACHE_TTL = 3600
+PUBMED_CACHE_MAX_ENTRIES = 256
+
+@st.cache_resource
+def get_pubmed_cache() -> Dict:
+    """TTL cache of (query, max_results) -> article list, shared across reruns."""
+    return {}
+
+# Fields pulled from each PubmedArticle; the first match in document
+# order is the right one, except Year, which must come from PubDate
+# (DateCompleted/DateRevised carry their own Year elements earlier)
+_PUBMED_FIELDS = ("PMID", "ArticleTitle", "AbstractText", "Year")
+
+@st.cache_data(ttl=PUBMED_CACHE_TTL, max_entries=PUBMED_CACHE_MAX_ENTRIES, show_spinner=False)
+def _parse_pubmed_xml(xml_bytes: bytes) -> List[Dict]:
+    """Parse an efetch XML payload into article dicts (memoized)."""
+    articles = []
+    for _, article_elem in etree.iterparse(io.BytesIO(xml_bytes), events=("end",), tag="PubmedArticle"):
+        # One DFS over the subtree instead of a findtext walk per field
+        fields = dict.fromkeys(_PUBMED_FIELDS, "")
+        remaining = len(fields)
+        for e in article_elem.iter():
+            tag = e.tag
+            if tag in fields and not fields[tag]:
+                if tag == "Year" and e.getparent().tag != "PubDate":
+                    continue
+                fields[tag] = e.text or ""
+                remaining -= 1
+                if not remaining:
+                    break
+        if fields["PMID"] and fields["ArticleTitle"]:
+            articles.append({
+                "pmid": fields["PMID"],
+                "title": fields["ArticleTitle"],
+                "abstract": fields["AbstractText"],
+                "year": fields["Year"]
+            })
+        article_elem.clear()
+    return articles
+
+# NCBI rate-limits aggressively (429s) and has transient 5xxs; retrying
+# with jittered backoff recovers without surfacing an error to the user
+@retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential_jitter(initial=0.5, max=8),
+    retry=retry_if_exception_type((httpx.TimeoutException, httpx.HTTPStatusError)),
+    reraise=True
+)
+async def _get_with_retry(client: httpx.AsyncClient, url: str, params: Dict) -> httpx.Response:
+    response = await client.get(url, params=params)
+    response.raise_for_status()
+    return response
+
+async def search_pubmed(query: str, max_results: int = 5) -> List[Dict]:
     """Search PubMed for relevant articles (cached for 1 hour)."""
     base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
 
+    # st.cache_data can't wrap a coroutine, so search results live in a
+    # hand-rolled TTL dict held by st.cache_resource
+    cache = get_pubmed_cache()
+    cache_key = (query, max_results)
+    entry = cache.get(cache_key)
+    now = time.monotonic()
+    if entry is not None and now - entry[0] < PUBMED_CACHE_TTL:
+        return entry[1]
+
+    client = get_http_client()
+
     try:
-        # Search for article IDs with reduced timeout
-        search_response = httpx.get(
+        # Search for article IDs
+        search_response = await _get_with_retry(
+            client,
             f"{base_url}esearch.fcgi",
-            params={"db": "pubmed", "term": query, "retmax": str(max_results), "retmode": "json", "sort": "relevance"},
-            timeout=10.0
+            params={"db": "pubmed", "term": query, "retmax": str(max_results), "retmode": "json", "sort": "relevance"}
         )
         search_data = search_response.json()
         id_list = search_data.get("esearchresult", {}).get("idlist", [])
@@ -219,167 +266,167 @@ def search_pubmed(query: str, max_results: int = 5) -> List[Dict]:
         if not id_list:
             return []
 
-        # Fetch article details with reduced timeout
-        fetch_response = httpx.get(
+        # Fetch article details
+        fetch_response = await _get_with_retry(
+            client,
             f"{base_url}efetch.fcgi",
-            params={"db": "pubmed", "id": ",".join(id_list), "retmode": "xml", "rettype": "abstract"},
-            timeout=10.0
+            params={"db": "pubmed", "id": ",".join(id_list), "retmode": "xml", "rettype": "abstract"}
         )
 
-        # Parse XML
-        articles = []
-        root = ET.fromstring(fetch_response.text)
-        for article_elem in root.findall(".//PubmedArticle"):
-            pmid = article_elem.findtext(".//PMID", "")
-            title = article_elem.findtext(".//ArticleTitle", "")
-            abstract = article_elem.findtext(".//Abstract/AbstractText", "")
-            year = article_elem.findtext(".//PubDate/Year", "")
-            if pmid and title:
-                articles.append({"pmid": pmid, "title": title, "abstract": abstract, "year": year})
+        # Bytes straight into the parser, skipping the text decode
+        articles = _parse_pubmed_xml(fetch_response.content)
+
+        if len(cache) >= PUBMED_CACHE_MAX_ENTRIES:
+            cache.pop(next(iter(cache)))
+        cache[cache_key] = (now, articles)
         return articles
     except Exception:
         return []
 
-def build_search_query(symptoms: List[str], conditions: List[str] = None) -> str:
+@functools.lru_cache(maxsize=128)
+def build_search_query(symptoms: Tuple[str, ...], conditions: Tuple[str, ...] = ()) -> str:
+    """Build the Entrez boolean query (pure, so memoized across submits)."""
     terms = [f'"{s}"[Title/Abstract]' for s in symptoms[:3]]
-    if conditions:
-        terms += [f'"{c}"[Title/Abstract]' for c in conditions[:2]]
+    terms += [f'"{c}"[Title/Abstract]' for c in conditions[:2]]
     return " OR ".join(terms) + " AND (review[pt] OR clinical trial[pt] OR meta-analysis[pt])"
 
+# --- Semantic Response Cache ---
+SEMANTIC_CACHE_THRESHOLD = 0.93
+
+@st.cache_resource
+def get_encoder():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer("paraphrase-albert-small-v2")
+
+@st.cache_resource
+def get_semantic_cache() -> Dict[str, List]:
+    """In-memory index of (embedding, response) pairs shared across reruns."""
+    return {"embeddings": [], "responses": []}
+
+def embed_query(text: str) -> np.ndarray:
+    embedding = get_encoder().encode(text, convert_to_numpy=True)
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm > 0 else embedding
+
+def semantic_cache_lookup(embedding: np.ndarray):
+    """Return the cached response closest to the embedding, or None."""
+    cache = get_semantic_cache()
+    if not cache["embeddings"]:
+        return None
+    scores = np.vstack(cache["embeddings"]) @ embedding
+    best = int(np.argmax(scores))
+    if scores[best] >= SEMANTIC_CACHE_THRESHOLD:
+        return cache["responses"][best]
+    return None
+
+def semantic_cache_store(embedding: np.ndarray, response: Dict[str, Any]) -> None:
+    cache = get_semantic_cache()
+    cache["embeddings"].append(embedding)
+    cache["responses"].append(response)
+
+async def run_pipeline(symptoms_input: str) -> Dict[str, Any]:
+    """Run extract -> diagnose -> PubMed -> summarize with semantic caching."""
+    embedding = embed_query(symptoms_input)
+    cached = semantic_cache_lookup(embedding)
+    if cached is not None:
+        return cached
+
+    # Steps 1+2: Extract symptoms and diagnose in a single LLM call
+    combined = await analyze_symptoms(symptoms_input)
+    extracted = combined.extracted
+
+    if not extracted.symptoms:
+        return {"extracted": extracted}
+
+    diagnosis = combined.diagnosis
+
+    # Step 3: Search PubMed (conditions are already known)
+    condition_names = [c.name for c in diagnosis.conditions]
+    articles = await search_pubmed(
+        build_search_query(tuple(extracted.symptoms), tuple(condition_names))
+    )
+
+    # Step 4 (summarize) happens at render time so tokens stream into the
+    # UI; the handler stores the finished response in the semantic cache.
+    # Abstracts are capped per-article and overall so the summarizer
+    # prompt stays bounded no matter how long the source abstracts run.
+    abstracts_text = ""
+    if articles:
+        abstracts_text = "\n\n".join(
+            f"Title: {a['title']}\nAbstract: {a['abstract'][:ABSTRACT_CHAR_LIMIT]}"
+            for a in articles if a.get('abstract')
+        )[:ABSTRACTS_TOTAL_CHAR_LIMIT]
+
+    return {
+        "extracted": extracted,
+        "diagnosis": diagnosis,
+        "articles": articles,
+        "abstracts_text": abstracts_text,
+        "embedding": embedding
+    }
+
+# --- Results Rendering ---
+def render_results(data: Dict[str, Any]) -> None:
+    """Render a pipeline result dict; streams the summary if not yet cached."""
+    ui_common.render_results(
+        data,
+        stream_summary=stream_summary,
+        store_summary=semantic_cache_store
+    )
+
 # --- Main App ---
 st.title("Medical Diagnosis Assistant")
 st.markdown("---")
 
 # Disclaimer banner
-st.markdown("""
-<div class="disclaimer-box">
-    <strong>⚠️ Important Disclaimer:</strong> This tool is for informational purposes only and is NOT medical advice.
-    Always consult with qualified healthcare professionals for diagnosis and treatment.
-    If you are experiencing a medical emergency, please call emergency services immediately.
-</div>
-""", unsafe_allow_html=True)
+ui_common.render_disclaimer()
 
 # Check for API key
 if not OPENAI_API_KEY:
     st.error("OpenAI API key not configured. Please add OPENAI_API_KEY to your Streamlit secrets.")
     st.stop()
 
+# Results survive reruns triggered by unrelated widget interactions
+st.session_state.setdefault("last_result", None)
+
 # Main content
 col1, col2 = st.columns([1, 2])
 
 with col1:
-    st.subheader("Describe Your Symptoms")
-    symptoms_input = st.text_area(
-        "Enter your symptoms",
-        placeholder="Example: I have been experiencing headaches, fatigue, and mild fever for 3 days...",
-        height=200,
-        help="Describe your symptoms in detail, including duration and severity if applicable."
-    )
-    submit_button = st.button("Get Diagnosis", type="primary", use_container_width=True)
+    symptoms_input, submit_button = ui_common.render_symptom_input()
 
-with col2:
+@st.fragment
+def results_fragment(symptoms_input: str, submit_button: bool) -> None:
+    """Results pane; interactions inside it rerun only this fragment."""
     if submit_button and symptoms_input:
         with st.spinner("Analyzing your symptoms..."):
             try:
-                # Step 1: Extract symptoms
-                extracted = extract_symptoms(symptoms_input)
+                data = run_async(run_pipeline(symptoms_input))
+                extracted = data["extracted"]
 
                 if not extracted.symptoms:
                     st.error("Could not extract any symptoms from the provided description")
                     st.stop()
 
-                # Step 2: Generate diagnosis
-                diagnosis = get_diagnosis(
-                    ", ".join(extracted.symptoms),
-                    extracted.duration or "Not specified",
-                    extracted.severity or "Not specified"
-                )
-
-                # Step 3: Search PubMed
-                condition_names = [c.name for c in diagnosis.conditions]
-                query = build_search_query(extracted.symptoms, condition_names)
-                articles = search_pubmed(query)
-
-                # Step 4: Summarize
-                summary_text = "No relevant medical literature found."
-                if articles:
-                    abstracts_text = "\n\n".join([
-                        f"Title: {a['title']}\nAbstract: {a['abstract'] or 'No abstract'}"
-                        for a in articles if a.get('abstract')
-                    ])
-                    if abstracts_text:
-                        result = get_summary(
-                            ", ".join(extracted.symptoms),
-                            ", ".join(condition_names),
-                            abstracts_text
-                        )
-                        summary_text = result.content
-
-                # Display results
-                st.subheader("Analysis Results")
-
-                # Extracted Symptoms
-                st.markdown("#### Extracted Symptoms")
-                symptoms_html = " ".join([f'<span class="symptom-tag">{s}</span>' for s in extracted.symptoms])
-                st.markdown(symptoms_html, unsafe_allow_html=True)
-
-                if extracted.duration:
-                    st.markdown(f"**Duration:** {extracted.duration}")
-                if extracted.severity:
-                    st.markdown(f"**Severity:** {extracted.severity}")
-
-                st.markdown("---")
-
-                # Diagnosis
-                st.markdown("#### Potential Conditions")
-                urgency = diagnosis.urgency
-                urgency_class = f"urgency-{urgency}"
-                st.markdown(f'<p class="{urgency_class}">Urgency Level: {urgency.upper()}</p>', unsafe_allow_html=True)
-
-                for condition in diagnosis.conditions:
-                    prob = condition.probability
-                    st.markdown(f"""
-                    <div class="condition-card condition-{prob}">
-                        <h4>{condition.name}</h4>
-                        <p><strong>Probability:</strong> {prob.capitalize()}</p>
-                        <p>{condition.description}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                # Recommendations
-                st.markdown("#### Recommendations")
-                for rec in diagnosis.recommendations:
-                    st.markdown(f"- {rec}")
-
-                st.markdown("---")
-
-                # PubMed Research
-                st.markdown("#### Medical Research Summary")
-                st.info(f"Found {len(articles)} relevant research articles")
-                st.markdown(summary_text)
-
-                if articles:
-                    with st.expander("View References"):
-                        for ref in articles:
-                            pmid = ref["pmid"]
-                            url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
-                            year = ref.get("year", "N/A")
-                            title = ref["title"]
-                            st.markdown(f"- [{title}]({url}) ({year})")
+                # render_results finishes the summary, so data is complete
+                # by the time it lands in session_state
+                render_results(data)
+                st.session_state["last_result"] = data
 
             except Exception as e:
                 st.error(f"An error occurred: {str(e)}")
 
     elif submit_button and not symptoms_input:
         st.warning("Please enter your symptoms before clicking 'Get Diagnosis'")
+    elif st.session_state["last_result"] is not None:
+        # Rerun from a widget interaction: redraw the last results without
+        # re-calling the LLM or PubMed
+        render_results(st.session_state["last_result"])
     else:
         st.info("Enter your symptoms in the text area and click 'Get Diagnosis' to receive an analysis.")
 
+with col2:
+    results_fragment(symptoms_input, submit_button)
+
 # Footer
-st.markdown("---")
-st.markdown("""
-<small>
-    <strong>Note:</strong> This application uses AI to analyze symptoms and search medical literature.
-    Results should be used for informational purposes only and are not a substitute for professional medical advice.
-</small>
-""", unsafe_allow_html=True)
+ui_common.render_footer()
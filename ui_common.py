@@ -0,0 +1,160 @@
+"""Shared Streamlit UI pieces for the diagnosis entry points.
+
+Keeping the CSS injection, disclaimer, input form and results pane here
+means every entry-point script imports them once (cached in sys.modules)
+instead of carrying its own copy.
+"""
+import os
+from typing import Any, Callable, Dict, Tuple
+
+import streamlit as st
+
+
+# Module-level template so the per-condition HTML isn't rebuilt from an
+# f-string literal on every render
+CARD_TMPL = (
+    '<div class="condition-card condition-{prob}">'
+    '<h4>{name}</h4>'
+    '<p><strong>Probability:</strong> {prob_label}</p>'
+    '<p>{description}</p>'
+    '</div>'
+)
+
+
+# Custom CSS, kept in a static file and memoized so reruns reuse the
+# same string instead of rebuilding a multi-KB literal
+@st.cache_data
+def _load_css() -> str:
+    with open(os.path.join(os.path.dirname(__file__), "static", "style.css")) as f:
+        return f"<style>{f.read()}</style>"
+
+
+def inject_css() -> None:
+    """Inject the shared page stylesheet."""
+    # st.html skips the Markdown parse that st.markdown(...,
+    # unsafe_allow_html=True) would run on every rerun
+    st.html(_load_css())
+
+
+def render_disclaimer() -> None:
+    """Render the medical disclaimer banner."""
+    st.html("""
+<div class="disclaimer-box">
+    <strong>⚠️ Important Disclaimer:</strong> This tool is for informational purposes only and is NOT medical advice.
+    Always consult with qualified healthcare professionals for diagnosis and treatment.
+    If you are experiencing a medical emergency, please call emergency services immediately.
+</div>
+""")
+
+
+def render_symptom_input() -> Tuple[str, bool]:
+    """Render the symptom entry form; returns (input text, submit pressed)."""
+    st.subheader("Describe Your Symptoms")
+    symptoms_input = st.text_area(
+        "Enter your symptoms",
+        placeholder="Example: I have been experiencing headaches, fatigue, and mild fever for 3 days...",
+        height=200,
+        help="Describe your symptoms in detail, including duration and severity if applicable."
+    )
+    submit_button = st.button("Get Diagnosis", type="primary", use_container_width=True)
+    return symptoms_input, submit_button
+
+
+def render_footer() -> None:
+    """Render the informational footer."""
+    st.markdown("---")
+    st.html("""
+<small>
+    <strong>Note:</strong> This application uses AI to analyze symptoms and search medical literature.
+    Results should be used for informational purposes only and are not a substitute for professional medical advice.
+</small>
+""")
+
+
+def render_results(
+    data: Dict[str, Any],
+    stream_summary: Callable = None,
+    store_summary: Callable = None
+) -> None:
+    """Render a pipeline result dict; streams the summary if not yet cached.
+
+    For results whose summary is still pending, stream_summary(symptoms,
+    conditions, abstracts) must yield text chunks; once the stream
+    finishes, store_summary(embedding, data) is called with the completed
+    response so the caller can cache it.
+    """
+    extracted = data["extracted"]
+    diagnosis = data["diagnosis"]
+    articles = data["articles"]
+
+    st.subheader("Analysis Results")
+
+    # Extracted Symptoms
+    st.markdown("#### Extracted Symptoms")
+    symptoms_html = " ".join([f'<span class="symptom-tag">{s}</span>' for s in extracted.symptoms])
+    st.html(symptoms_html)
+
+    if extracted.duration:
+        st.markdown(f"**Duration:** {extracted.duration}")
+    if extracted.severity:
+        st.markdown(f"**Severity:** {extracted.severity}")
+
+    st.markdown("---")
+
+    # Diagnosis
+    st.markdown("#### Potential Conditions")
+    urgency = diagnosis.urgency
+    urgency_class = f"urgency-{urgency}"
+    st.html(f'<p class="{urgency_class}">Urgency Level: {urgency.upper()}</p>')
+
+    # One markdown call for all cards instead of one frame per condition
+    cards_html = "".join(
+        CARD_TMPL.format(
+            prob=c.probability,
+            prob_label=c.probability.capitalize(),
+            name=c.name,
+            description=c.description
+        )
+        for c in diagnosis.conditions
+    )
+    st.html(cards_html)
+
+    # Recommendations
+    st.markdown("#### Recommendations")
+    st.markdown("\n".join(f"- {rec}" for rec in diagnosis.recommendations))
+
+    st.markdown("---")
+
+    # PubMed Research
+    st.markdown("#### Medical Research Summary")
+    st.info(f"Found {len(articles)} relevant research articles")
+
+    if "summary_text" in data:
+        # Semantic cache hit or rerun - the summary is already complete
+        st.markdown(data["summary_text"])
+    else:
+        condition_names = [c.name for c in diagnosis.conditions]
+        if data["abstracts_text"]:
+            # Stream tokens into the UI as the LLM generates them
+            summary_text = st.write_stream(stream_summary(
+                ", ".join(extracted.symptoms),
+                ", ".join(condition_names),
+                data["abstracts_text"]
+            ))
+        else:
+            summary_text = "No relevant medical literature found."
+            st.markdown(summary_text)
+
+        embedding = data.pop("embedding")
+        data.pop("abstracts_text")
+        data["summary_text"] = summary_text
+        store_summary(embedding, data)
+
+    if articles:
+        with st.expander("View References"):
+            for ref in articles:
+                pmid = ref["pmid"]
+                url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
+                year = ref.get("year", "N/A")
+                title = ref["title"]
+                st.markdown(f"- [{title}]({url}) ({year})")